@@ -7,28 +7,21 @@ import re
 
 router = APIRouter()
 
+# Variant ID formats compiled once at import:
+# CHR-POS-REF-ALT, CHR:POS-REF-ALT and the region format CHR:START-END
+VARIANT_ID_PATTERN = re.compile(
+    r'^([0-9]{1,2}|X|Y|MT?)(-\d+-[ACGT]+-[ACGT]+|:\d+-[ACGT]+-[ACGT]+|:\d+-\d+)$',
+    re.IGNORECASE,
+)
+
 def validate_variant_id(variant_id: str) -> bool:
     """Validate variant ID format (chr-pos-ref-alt, rsid, or chr:start-end)"""
     # RSID format
     if variant_id.lower().startswith('rs'):
         return True
     
-    # Standard format: CHR-POS-REF-ALT
-    standard_pattern = r'^([0-9]{1,2}|X|Y|MT?)-\d+-[ACGT]+-[ACGT]+$'
-    if re.match(standard_pattern, variant_id, re.IGNORECASE):
-        return True
-
-    # New format: CHR:POS-REF-ALT
-    colon_pattern = r'^([0-9]{1,2}|X|Y|MT?):\d+-[ACGT]+-[ACGT]+$'
-    if re.match(colon_pattern, variant_id, re.IGNORECASE):
-        return True
-        
-    # Region format: CHR:START-END
-    region_pattern = r'^([0-9]{1,2}|X|Y|MT?):\d+-\d+$'
-    if re.match(region_pattern, variant_id, re.IGNORECASE):
-        return True
-        
-    return False
+    # Standard, colon and region formats
+    return VARIANT_ID_PATTERN.match(variant_id) is not None
 
 @router.get("/{variant_id}", response_model=VariantDetail)
 async def get_variant(variant_id: str):
@@ -66,6 +59,8 @@ async def get_variant(variant_id: str):
             raise HTTPException(status_code=404, detail="Variant not found")
         
         variant = hits[0]['_source']
+        # Indexes built before filters became an array hold a comma-joined string
+        filters = variant.get('filters') or []
         
         # Map to Pydantic model
         return {
@@ -77,7 +72,7 @@ async def get_variant(variant_id: str):
                 "alt": variant.get('alt'),
                 "type": variant.get('variant_type'),
                 "quality": variant.get('quality'),
-                "filter": variant.get('filters').split(',') if variant.get('filters') else [],
+                "filter": filters.split(',') if isinstance(filters, str) else filters,
                 "rsid": variant.get('rsid'),
                 "gnomad_af": variant.get('gnomad_af'),
                 "max_pop_af": variant.get('max_pop_af'),
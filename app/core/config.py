@@ -10,6 +10,8 @@ class Settings(BaseSettings):
     # Elasticsearch
     ELASTICSEARCH_URL: str
     ES_INDEX: str
+    # Pooled connections per Elasticsearch node, shared by the requests of a worker
+    ES_MAX_CONNECTIONS: int = 50
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = []
@@ -6,7 +6,9 @@ class ElasticsearchClient:
 
     async def connect(self):
         if self.client is None:
-            self.client = AsyncElasticsearch(settings.ELASTICSEARCH_URL)
+            self.client = AsyncElasticsearch(
+                settings.ELASTICSEARCH_URL, maxsize=settings.ES_MAX_CONNECTIONS
+            )
             print(f"✓ Connecting to Elasticsearch at {settings.ELASTICSEARCH_URL}")
 
     async def close(self):
@@ -7,10 +7,15 @@ import os
 bind = "0.0.0.0:8000"
 
 # Worker Options
-# Standard formula: 2 * CPUs + 1
-workers = 64  # One per core is often a good starting point for async workers on large machines.
+# One async Uvicorn worker per core (2 * CPUs + 1 is meant for sync workers).
+# Override with the WEB_CONCURRENCY environment variable.
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
 worker_class = "uvicorn.workers.UvicornWorker"
 
+# Import the app once in the master before forking, so workers share its pages.
+# The Elasticsearch client is only created in each worker's lifespan.
+preload_app = True
+
 # Timeout
 # Increase timeout for long queries if necessary
 timeout = 120
@@ -9,10 +9,97 @@ Usage:
 """
 
 import argparse
+import os
+from typing import Dict, Optional
+
 import hail as hl
 
+# Upper bound on documents per bulk request; Hail passes the block size to
+# es-hadoop as es.batch.size.entries
+ES_BLOCK_SIZE = 20000
+# Payload targeted by each bulk request when sizing it from the documents
+ES_BULK_BYTES = 10 * 1024 * 1024
+
+# es-hadoop settings for bulk indexing of wide, flattened variant rows.
+# 'es.nodes.wan.only' is set to true to allow connecting to container/remote IPs.
+ES_CONFIG = {
+    "es.nodes.wan.only": "true",
+    # Ceiling for batches of unusually large documents
+    "es.batch.size.bytes": "50mb",
+    "es.http.timeout": "5m",
+    "es.batch.write.retry.count": "6",
+}
+
+
+# Row fields left out of the documents: the portal never reads per-sample
+# genotypes, and they grow every document with the number of samples
+ES_EXCLUDED_FIELDS = ("samples",)
+
+
+def prepare_for_export(ht: hl.Table) -> hl.Table:
+    """
+    Drop the fields that are not indexed and flatten the table for Elasticsearch.
+
+    Args:
+        ht (hl.Table): Variant table written by `parse_nirvana.py`.
+
+    Returns:
+        hl.Table: Flattened table holding the indexed fields, with the key of
+            the input table.
+    """
+    ht = ht.drop(*(field for field in ES_EXCLUDED_FIELDS if field in ht.row))
+    return ht.flatten()
+
+
+def build_spark_conf(args: argparse.Namespace) -> Dict[str, str]:
+    """
+    Build the Spark configuration from the command-line arguments.
+
+    Args:
+        args (argparse.Namespace): Parsed arguments from `get_parser`.
+
+    Returns:
+        Dict[str, str]: Spark configuration for `hl.init`.
+    """
+    return {
+        'spark.driver.memory': args.driver_memory,
+        'spark.executor.memory': args.executor_memory,
+        'spark.driver.maxResultSize': '100g',
+        # Spark caps the Kryo buffer below 2048m
+        'spark.kryoserializer.buffer.max': args.kryo_buffer_max,
+        'spark.memory.offHeap.enabled': 'true',
+        'spark.memory.offHeap.size': args.off_heap_size,
+        'spark.sql.shuffle.partitions': str(args.shuffle_partitions),
+    }
+
 
-def export_table(input_path: str, host: str, port: int, index: str) -> None:
+def estimate_block_size(ht: hl.Table, sample_size: int = 1000) -> int:
+    """
+    Estimate the documents per bulk request from the size of sampled rows.
+
+    Args:
+        ht (hl.Table): Table about to be exported.
+        sample_size (int): Number of leading rows to measure.
+
+    Returns:
+        int: Block size carrying about ES_BULK_BYTES, between 500 and ES_BLOCK_SIZE.
+    """
+    sample = ht.head(sample_size)
+    avg_bytes = sample.aggregate(hl.agg.mean(hl.len(hl.json(sample.row))))
+    # The mean of an empty table is NaN
+    if not avg_bytes > 0:
+        return ES_BLOCK_SIZE
+    return max(500, min(ES_BLOCK_SIZE, int(ES_BULK_BYTES // avg_bytes)))
+
+
+def export_table(
+    input_path: str,
+    host: str,
+    port: int,
+    index: str,
+    spark_conf: Dict[str, str],
+    partitions: Optional[int] = None,
+) -> None:
     """
     Export a Hail Table to Elasticsearch.
 
@@ -21,39 +108,44 @@ def export_table(input_path: str, host: str, port: int, index: str) -> None:
         host (str): Elasticsearch host address.
         port (int): Elasticsearch port number.
         index (str): Name of the target Elasticsearch index.
+        spark_conf (Dict[str, str]): Spark configuration for `hl.init`.
+        partitions (Optional[int]): Number of partitions, i.e. parallel bulk
+            writers, to export with. None keeps the layout of the table.
     """
-    # Initialize Hail with Spark configuration optimized for large datasets
-    hl.init(spark_conf={
-        'spark.driver.memory': '320g',
-        'spark.executor.memory': '320g',
-        'spark.driver.maxResultSize': '100g',
-        'spark.kryoserializer.buffer.max': '2047G'
-    })
+    hl.init(spark_conf=spark_conf)
     
     print(f"Loading Hail Table from {input_path}...")
     ht = hl.read_table(input_path)
     
-    # Flatten the table structure for easier indexing in Elasticsearch
-    ht = ht.flatten()
+    # Drop unused fields and flatten the table structure for easier indexing
+    ht = prepare_for_export(ht)
     
     # Print schema for verification
     print("Table Schema:")
     ht.describe()
     
+    # Sample the table as read: head() on the repartitioned table would run the
+    # whole shuffle once more before the export runs it again
+    block_size = estimate_block_size(ht)
+    if partitions:
+        # The table is still keyed by (locus, alleles): flatten only expands
+        # struct fields and neither key field is one. Repartitioning a keyed
+        # table range-splits it on the key, so every writer gets a similar share
+        print(f"Repartitioning into {partitions} partitions...")
+        ht = ht.repartition(partitions)
+    
     print(f"Exporting to Elasticsearch ({host}:{port}/{index})...")
+    print(f"Documents per bulk request: {block_size}")
     
     # Export to Elasticsearch
-    # Note: 'es.nodes.wan.only' is set to true to allow connecting to container/remote IPs
     hl.export_elasticsearch(
         ht,
         host=host,
         port=port,
         index=index,
         index_type='_doc',
-        block_size=2500,
-        config={
-            "es.nodes.wan.only": "true"
-        }
+        block_size=block_size,
+        config=ES_CONFIG,
     )
     
     print(f"Successfully exported table to index '{index}'.")
@@ -94,6 +186,42 @@ def get_parser() -> argparse.ArgumentParser:
         default="fiocruz_variants",
         help="Elasticsearch index name"
     )
+    parser.add_argument(
+        "--driver-memory",
+        type=str,
+        default="32g",
+        help="Spark driver memory"
+    )
+    parser.add_argument(
+        "--executor-memory",
+        type=str,
+        default="32g",
+        help="Spark executor memory"
+    )
+    parser.add_argument(
+        "--kryo-buffer-max",
+        type=str,
+        default="512m",
+        help="Maximum Kryo serialization buffer (must be below 2048m)"
+    )
+    parser.add_argument(
+        "--off-heap-size",
+        type=str,
+        default="16g",
+        help="Spark off-heap memory size"
+    )
+    parser.add_argument(
+        "--shuffle-partitions",
+        type=int,
+        default=2 * (os.cpu_count() or 1),
+        help="Number of Spark SQL shuffle partitions"
+    )
+    parser.add_argument(
+        "--partitions",
+        type=int,
+        default=None,
+        help="Repartition the table into this many export tasks (default: keep)"
+    )
     return parser
 
 
@@ -106,7 +234,9 @@ def main() -> None:
         input_path=args.input_path,
         host=args.host,
         port=args.port,
-        index=args.index
+        index=args.index,
+        spark_conf=build_spark_conf(args),
+        partitions=args.partitions,
     )
 
 
@@ -11,21 +11,109 @@ Usage:
 
 import argparse
 import gzip
+import io
+import multiprocessing
 import os
 import tempfile
-from decimal import Decimal
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from functools import cached_property
 from pathlib import Path
-from typing import Any, Dict, Generator, List, Optional
+from typing import Any, ClassVar, Dict, Generator, Iterator, List, Optional, Tuple
 
 import hail as hl
 import ijson
-import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pydantic
+from hail.utils.java import Env
+
+from export_to_es import (
+    ES_CONFIG,
+    build_spark_conf,
+    estimate_block_size,
+    prepare_for_export,
+)
+
+try:
+    # Optional: parallel gzip decompression
+    import rapidgzip
+except ImportError:
+    rapidgzip = None
+
+try:
+    # Optional: ISA-L accelerated single-threaded gzip decompression
+    from isal import igzip
+except ImportError:
+    igzip = None
+
+try:
+    # Optional: fast per-position JSON decoding
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure Pandas to show all columns for debugging
 pd.set_option("display.max_columns", None)
 
+
+def _load_ijson_backend() -> Any:
+    """
+    Load the fastest available ijson backend, preferring the C (yajl2_c) one.
+
+    Returns:
+        The ijson backend module.
+    """
+    for name in ("yajl2_c", "yajl2_cffi", "yajl2"):
+        try:
+            return ijson.get_backend(name)
+        except ImportError:
+            continue
+    return ijson
+
+
+ijson_backend = _load_ijson_backend()
+
+# Read size used when buffering the decompressed stream and by ijson reads
+IJSON_BUF_SIZE = 1 << 20
+
+# Nirvana writes the header on the first line, ending where the positions start
+POSITIONS_START = b'"positions":['
+# Longest header line looked for; longer first lines (e.g. minified JSON) go
+# through ijson instead of being decompressed into memory in one piece
+HEADER_LINE_MAX = 1 << 20
+# Every variant carries a "vid"; counted in undecoded lines to size the chunks
+VARIANT_KEY = b'"vid":'
+# Variant indices of a chunk start at its number times this stride, so they are
+# unique without the reading process knowing how many variants a chunk holds
+CHUNK_INDEX_STRIDE = 1 << 32
+# Minimum rows per Parquet row group; batches are gathered until they reach it
+ROW_GROUP_ROWS = 1 << 16
+# Memory budgeted per conversion worker: each spawned process imports hail,
+# pandas and pyarrow and holds its batch's columns
+WORKER_MEMORY = 1 << 30
+
+
+def _read_position_lines(f: Any, decode: bool = True) -> Generator[Any, None, None]:
+    """
+    Decode positions written one per line, as Nirvana does, with orjson.
+
+    Args:
+        f: Binary file object positioned after the header line
+        decode: Whether to decode the lines or yield their JSON bytes
+    Returns:
+        Generator of position dictionaries (or JSON bytes), ending at the
+        closing bracket
+    """
+    for line in f:
+        if line.startswith(b"]"):
+            return
+        line = line.rstrip(b",\r\n")
+        yield orjson.loads(line) if decode else line
+
+
 # # Define ClinVar values
 # SET_PATHOGENIC = {
 #     "Pathogenic", "Likely pathogenic", 
@@ -51,6 +139,18 @@ pd.set_option("display.max_columns", None)
 # SET_ASSOCIATION = {"association"}
 # SET_RISK_FACTOR = {"risk factor"}
 
+# Transcript annotation fields, shared by the transcript rows and the canonical transcript
+TRANSCRIPT_FIELDS = {
+    "transcript_id": hl.tstr,
+    "source": hl.tstr,
+    "bio_type": hl.tstr,
+    "gene_id": hl.tstr,
+    "hgnc": hl.tstr,
+    "consequences": hl.tarray(hl.tstr),
+    "impact": hl.tstr,
+    "is_canonical": hl.tbool,
+}
+
 # Define complete Hail schema with proper types
 HAIL_SCHEMA = {
     "chromosome": hl.tstr,
@@ -63,7 +163,7 @@ HAIL_SCHEMA = {
     "begin": hl.tint32,
     "end": hl.tint32,
     # Quality metrics
-    "filters": hl.tstr,
+    "filters": hl.tarray(hl.tstr),
     "mapping_quality": hl.tfloat64,
     "fisher_strand_bias": hl.tfloat64,
     "quality": hl.tfloat64,
@@ -107,32 +207,66 @@ HAIL_SCHEMA = {
     "clinvar_id": hl.tstr,
     # Transcript count
     "n_transcripts": hl.tint32,
-    # Transcripts - nested structure
-    "transcripts": hl.tarray(
-        hl.tstruct(
-            transcript_id=hl.tstr,
-            source=hl.tstr,
-            bio_type=hl.tstr,
-            gene_id=hl.tstr,
-            hgnc=hl.tstr,
-            consequences=hl.tarray(hl.tstr),
-            impact=hl.tstr,
-            is_canonical=hl.tbool,
-        )
-    ),
-    # Samples - nested structure (optional)
-    "samples": hl.tarray(
-        hl.tstruct(
-            genotype=hl.tstr,
-            variant_frequencies=hl.tarray(hl.tfloat64),
-            total_depth=hl.tint32,
-            genotype_quality=hl.tint32,
-            allele_depths=hl.tarray(hl.tint32),
-        )
-    ),
+    # Transcript summaries, computed while reading so the full list is optional
+    "canonical_transcript": hl.tstruct(**TRANSCRIPT_FIELDS),
+    "all_consequences": hl.tarray(hl.tstr),
+    "genes": hl.tarray(hl.tstr),
+    # Row identifier used to join transcripts and samples (dropped from the output)
+    "variant_index": hl.tint64,
+}
+
+# Transcripts - one row per transcript, joined back to the variant by variant_index
+TRANSCRIPT_SCHEMA = {
+    "variant_index": hl.tint64,
+    "transcript_index": hl.tint32,
+    **TRANSCRIPT_FIELDS,
+}
+
+# Samples - one row per sample, joined back to the variant by variant_index (optional)
+SAMPLE_SCHEMA = {
+    "variant_index": hl.tint64,
+    "sample_index": hl.tint32,
+    "genotype": hl.tstr,
+    "variant_frequencies": hl.tarray(hl.tfloat64),
+    "total_depth": hl.tint32,
+    "genotype_quality": hl.tint32,
+    "allele_depths": hl.tarray(hl.tint32),
+}
+
+_ARROW_TYPES = {
+    hl.tstr: pa.string(),
+    hl.tint32: pa.int32(),
+    hl.tint64: pa.int64(),
+    hl.tfloat64: pa.float64(),
+    hl.tbool: pa.bool_(),
 }
 
 
+def arrow_schema(schema: Dict[str, Any]) -> pa.Schema:
+    """
+    Build the Arrow schema of the Parquet batches for a Hail schema.
+
+    Args:
+        schema: Hail schema mapping field names to types
+    Returns:
+        Arrow schema with the same fields, in the same order
+    """
+
+    def arrow_type(hail_type: Any) -> pa.DataType:
+        if isinstance(hail_type, hl.tarray):
+            return pa.list_(arrow_type(hail_type.element_type))
+        if isinstance(hail_type, hl.tstruct):
+            return pa.struct([(name, arrow_type(t)) for name, t in hail_type.items()])
+        return _ARROW_TYPES[hail_type]
+
+    return pa.schema([(name, arrow_type(t)) for name, t in schema.items()])
+
+
+VARIANT_ARROW_SCHEMA = arrow_schema(HAIL_SCHEMA)
+TRANSCRIPT_ARROW_SCHEMA = arrow_schema(TRANSCRIPT_SCHEMA)
+SAMPLE_ARROW_SCHEMA = arrow_schema(SAMPLE_SCHEMA)
+
+
 # def clinvar_transform(clinvar_value: str | None) -> str:
 #     """
 #     Transformation of ClinVar string to consensus classification.
@@ -197,26 +331,51 @@ HAIL_SCHEMA = {
 # https://github.com/Illumina/IlluminaConnectedAnnotationsDocumentation/blob/master/static/files/parse-json-python.ipynb
 
 
-def _convert_for_hail(obj: Any) -> Any:
+def _flatten(record: Dict[str, Any], sep: str = ".") -> Iterator[Tuple[str, Any]]:
     """
-    Recursively convert Decimal and numpy types to plain Python types Hail accepts.
+    Flatten nested dictionaries into `(key, value)` pairs with joined keys.
+
+    Lists are kept as values, empty dictionaries are dropped and nested keys
+    follow the scalar keys of their level, matching `pd.json_normalize`
+    without its per-record recursion and type checks.
 
     Args:
-        obj: The object to convert.
+        record: Dictionary to flatten
+        sep: Separator between nested key names
     Returns:
-        The converted object.
+        Iterator of flattened `(key, value)` pairs
+    """
+    stack = [("", record)]
+    while stack:
+        prefix, values = stack.pop()
+        nested = []
+        for key, value in values.items():
+            if isinstance(value, dict):
+                nested.append((f"{prefix}{key}{sep}", value))
+            else:
+                yield f"{prefix}{key}", value
+        stack.extend(reversed(nested))
+
+
+def _drop_unset(
+    model: pydantic.BaseModel, data: Dict[str, Any], names: Any
+) -> Dict[str, Any]:
     """
-    if isinstance(obj, dict):
-        return {k: _convert_for_hail(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_convert_for_hail(v) for v in obj]
-    if isinstance(obj, Decimal):
-        return float(obj)
-    if isinstance(obj, (np.floating, np.float32, np.float64)):  # type: ignore[arg-type]
-        return float(obj)
-    if isinstance(obj, (np.integer, np.int32, np.int64)):  # type: ignore[arg-type]
-        return int(obj)
-    return obj
+    Remove the given declared fields from a dump unless the record set them.
+
+    Args:
+        model: Model instance that produced the dump
+        data: Serialized model, keyed by field names or aliases
+        names: Names of the fields to drop when they were not set
+    Returns:
+        Dump without the unset fields, so they do not become empty columns
+    """
+    fields = type(model).model_fields
+    unset = set()
+    for name in names:
+        if name not in model.model_fields_set:
+            unset.update((name, fields[name].alias or name))
+    return {key: value for key, value in data.items() if key not in unset}
 
 
 class BaseClass(pydantic.BaseModel):
@@ -228,23 +387,33 @@ class BaseClass(pydantic.BaseModel):
     model_config = pydantic.ConfigDict(extra="allow")
 
     def get_top_level(self) -> pd.DataFrame:
-        return pd.json_normalize(self.get_top_level_dict())
+        return pd.DataFrame([dict(_flatten(self.get_top_level_dict()))])
 
     def get_top_level_dict(self) -> Dict[str, Any]:
         raise NotImplementedError
 
     def to_df(self, key: str = "") -> pd.DataFrame:
+        # Columns follow the declared fields, then the extra fields in JSON order
+        return pd.DataFrame(self.to_records(key))
+
+    def to_records(self, key: str = "") -> List[Dict[str, Any]]:
         if not key:
-            return pd.json_normalize(self.model_dump())
+            return [dict(_flatten(self.model_dump(by_alias=True)))]
 
-        values = self.model_dump().get(key)
+        # Dump only the requested field (declared or extra), not the whole model
+        name = next(
+            (n for n, f in type(self).model_fields.items() if f.alias == key), key
+        )
+        values = self.model_dump(by_alias=True, include={name}).get(key)
+        # The top-level fields are the same for every item, so build them once
+        top = self.get_top_level_dict()
 
         if isinstance(values, list):
-            merged = [self.get_top_level_dict() | value for value in values]
+            merged = [dict(top, **value) for value in values]
         else:
-            merged = [self.get_top_level_dict() | {key: values}]
+            merged = [dict(top, **{key: values})]
 
-        return pd.json_normalize(merged)
+        return [dict(_flatten(record)) for record in merged]
 
 
 class Transcript(BaseClass):
@@ -262,9 +431,34 @@ class Transcript(BaseClass):
     isCanonical: Optional[bool] = None
 
     def get_top_level_dict(self) -> Dict[str, Any]:
-        return dict(
-            zip(("transcript", "isCanonical"), (self.transcript, self.isCanonical))
-        )
+        return {"transcript": self.transcript, "isCanonical": self.isCanonical}
+
+
+class PopulationFrequencies(pydantic.BaseModel):
+    """
+    Allele frequency annotation model (gnomAD, gnomAD exome and TOPMed).
+    """
+
+    model_config = pydantic.ConfigDict(extra="allow")
+
+    allAf: Optional[float] = None
+    allAc: Optional[int] = None
+    allAn: Optional[int] = None
+    allHc: Optional[int] = None
+    afrAf: Optional[float] = None
+    amrAf: Optional[float] = None
+    easAf: Optional[float] = None
+    finAf: Optional[float] = None
+    nfeAf: Optional[float] = None
+    asjAf: Optional[float] = None
+    sasAf: Optional[float] = None
+    othAf: Optional[float] = None
+    failedFilter: Optional[bool] = None
+
+    @pydantic.model_serializer(mode="wrap")
+    def _serialize(self, handler: Any) -> Dict[str, Any]:
+        # Only the frequencies present in the annotation become to_df columns
+        return _drop_unset(self, handler(self), type(self).model_fields)
 
 
 class Variant(BaseClass):
@@ -282,22 +476,48 @@ class Variant(BaseClass):
     hgvsg: Optional[str] = None
     phylopScore: Optional[float] = None
     phyloPPrimateScore: Optional[float] = None
+    fisherStrandBias: Optional[float] = None
+    quality: Optional[float] = None
+    gerpScore: Optional[float] = None
+    dannScore: Optional[float] = None
+    # dbSNP and ClinVar come either as a single object or as a list of them
+    dbsnp: Optional[Any] = None
+    gnomad: Optional[PopulationFrequencies] = None
+    gnomad_exome: Optional[PopulationFrequencies] = pydantic.Field(
+        None, alias="gnomad-exome"
+    )
+    topmed: Optional[PopulationFrequencies] = None
+    # Not named `clinvar`: that is Nirvana's legacy ClinVar key, which stays extra
+    clinvar_preview: Optional[Any] = pydantic.Field(None, alias="clinvar-preview")
     transcripts: Optional[List[Transcript]] = None
 
+    # Typed annotation fields that stay out of to_df when the record lacks them,
+    # as they did while they were plain extra fields
+    ANNOTATION_FIELDS: ClassVar[Tuple[str, ...]] = (
+        "fisherStrandBias",
+        "quality",
+        "gerpScore",
+        "dannScore",
+        "dbsnp",
+        "gnomad",
+        "gnomad_exome",
+        "topmed",
+        "clinvar_preview",
+    )
+
+    @pydantic.model_serializer(mode="wrap")
+    def _serialize(self, handler: Any) -> Dict[str, Any]:
+        return _drop_unset(self, handler(self), self.ANNOTATION_FIELDS)
+
     def get_top_level_dict(self) -> Dict[str, Any]:
-        return dict(
-            zip(
-                ("chromosome", "begin", "end", "refAllele", "altAllele", "hgvsg"),
-                (
-                    self.chromosome,
-                    self.begin,
-                    self.end,
-                    self.refAllele,
-                    self.altAllele,
-                    self.hgvsg,
-                ),
-            )
-        )
+        return {
+            "chromosome": self.chromosome,
+            "begin": self.begin,
+            "end": self.end,
+            "refAllele": self.refAllele,
+            "altAllele": self.altAllele,
+            "hgvsg": self.hgvsg,
+        }
 
 
 class Position(BaseClass):
@@ -317,30 +537,16 @@ class Position(BaseClass):
     variants: Optional[List[Variant]] = None
 
     def get_top_level_dict(self) -> Dict[str, Any]:
-        return dict(
-            zip(
-                (
-                    "chromosome",
-                    "position",
-                    "refAllele",
-                    "altAlleles",
-                    "filters",
-                    "mappingQuality",
-                    "cytogeneticBand",
-                    "vcfInfo",
-                ),
-                (
-                    self.chromosome,
-                    self.position,
-                    self.refAllele,
-                    self.altAlleles,
-                    self.filters,
-                    self.mappingQuality,
-                    self.cytogeneticBand,
-                    self.vcfInfo,
-                ),
-            )
-        )
+        return {
+            "chromosome": self.chromosome,
+            "position": self.position,
+            "refAllele": self.refAllele,
+            "altAlleles": self.altAlleles,
+            "filters": self.filters,
+            "mappingQuality": self.mappingQuality,
+            "cytogeneticBand": self.cytogeneticBand,
+            "vcfInfo": self.vcfInfo,
+        }
 
 
 class AnnotatedData:
@@ -361,36 +567,88 @@ class AnnotatedData:
         self._filename = filename
 
         # Print metadata on initialization
+        print(f"ijson backend: {ijson_backend.backend}")
         for key in ("annotator", "genomeAssembly", "creationTime"):
             print(f"{key}: {self.header[key]}")
 
-    @property
+    def _open_gz(self) -> Any:
+        """
+        Open the gzipped JSON file for binary reading.
+
+        Uses rapidgzip to decompress with all cores when it is installed, then
+        ISA-L's igzip, otherwise the standard library gzip module. The
+        decompressed stream is wrapped in a large read buffer so line reads and
+        ijson pulls do not cross into the decompressor for every few kilobytes.
+
+        Returns:
+            A binary file-like object.
+        """
+        if rapidgzip is not None:
+            f = rapidgzip.open(self._filename, parallelization=os.cpu_count())
+        elif igzip is not None:
+            f = igzip.open(self._filename, "rb")
+        else:
+            f = gzip.open(self._filename, "rb")
+        return io.BufferedReader(f, buffer_size=IJSON_BUF_SIZE)
+
+    @cached_property
     def header(self) -> Dict[str, Any]:
-        """Get the JSON header section."""
-        with gzip.open(self._filename, "r") as f:
-            return next(ijson.items(f, "header"))
+        """Get the JSON header section (read once and cached)."""
+        with self._open_gz() as f:
+            return next(
+                ijson_backend.items(
+                    f, "header", use_float=True, buf_size=IJSON_BUF_SIZE
+                )
+            )
 
-    @property
+    @cached_property
     def data_sources(self) -> pd.DataFrame:
         """Get data sources as a DataFrame."""
         return pd.DataFrame(self.header["dataSources"]).set_index("name").sort_index()
 
-    @property
+    @cached_property
     def genes(self) -> pd.DataFrame:
-        """Get genes section as a DataFrame."""
-        with gzip.open(self._filename, "r") as f:
-            return pd.json_normalize(ijson.items(f, "genes.item"))
+        """Get genes section as a DataFrame (read once and cached)."""
+        with self._open_gz() as f:
+            return pd.DataFrame(
+                [
+                    dict(_flatten(gene))
+                    for gene in ijson_backend.items(
+                        f, "genes.item", use_float=True, buf_size=IJSON_BUF_SIZE
+                    )
+                ]
+            )
 
-    @property
-    def positions(self) -> Generator[Any, None, None]:
+    @contextmanager
+    def open_positions(self, raw: bool = False) -> Iterator[Generator[Any, None, None]]:
         """
-        Generator yielding position items.
-        
+        Open the file and stream its position items.
+
+        The file stays open until the `with` block exits. Non-integer numbers
+        are decoded as float rather than Decimal.
+
+        When orjson is installed and the file has Nirvana's one-position-per-line
+        layout, each line is decoded with orjson; otherwise ijson streams the
+        positions array.
+
+        Args:
+            raw (bool): Yield the JSON bytes of each line undecoded, for the
+                caller to decode with `orjson.loads`. Only applies to the
+                one-position-per-line layout; ijson always yields dictionaries.
+
         Returns:
-            Generator[Any, None, None]: Stream of position dictionaries.
+            Iterator[Generator[Any, None, None]]: Context manager yielding a
+            stream of position dictionaries.
         """
-        f = gzip.open(self._filename, "r")
-        return ijson.items(f, "positions.item")
+        with self._open_gz() as f:
+            header = f.readline(HEADER_LINE_MAX) if orjson is not None else b""
+            if header.rstrip().endswith(POSITIONS_START):
+                yield _read_position_lines(f, decode=not raw)
+            else:
+                f.seek(0)
+                yield ijson_backend.items(
+                    f, "positions.item", use_float=True, buf_size=IJSON_BUF_SIZE
+                )
 
     def get_annotation(self, chromosome: str, position: int) -> Dict[str, Any]:
         """
@@ -406,15 +664,16 @@ class AnnotatedData:
         Raises:
             Exception: If annotation is not found.
         """
-        annotation = next(
-            (
-                position_item
-                for position_item in self.positions
-                if chromosome == position_item.get("chromosome")
-                and position == position_item.get("position")
-            ),
-            {},
-        )
+        with self.open_positions() as positions:
+            annotation = next(
+                (
+                    position_item
+                    for position_item in positions
+                    if chromosome == position_item.get("chromosome")
+                    and position == position_item.get("position")
+                ),
+                {},
+            )
 
         if not annotation:
             raise Exception(f"Cannot find annotation for {chromosome=} and {position=}")
@@ -435,17 +694,55 @@ class AnnotatedData:
         Returns:
             Generator[Any, Any, None]: Generator of annotation dictionaries.
         """
-        return (
-            position_item
-            for position_item in self.positions
-            if chromosome == position_item.get("chromosome")
-            and position <= position_item.get("position") <= end
-        )
+        with self.open_positions() as positions:
+            for position_item in positions:
+                if (
+                    chromosome == position_item.get("chromosome")
+                    and position <= position_item.get("position") <= end
+                ):
+                    yield position_item
 
     @staticmethod
     def multiple_to_df(items: List[BaseClass], key: str = "") -> pd.DataFrame:
-        """Convert a list of Pydantic models to a DataFrame."""
-        return pd.concat((item.to_df(key) for item in items))
+        """
+        Convert a list of Pydantic models to a DataFrame.
+
+        Values missing from a record are NaN, so numeric columns with gaps are
+        float columns, as `pd.DataFrame` infers them for the whole list.
+        """
+        # One frame from all records instead of concatenating one per item
+        return pd.DataFrame([row for item in items for row in item.to_records(key)])
+
+
+def construct_position(position: Dict[str, Any]) -> Position:
+    """
+    Build a Position from a decoded position dictionary without validation.
+
+    `model_construct` is used instead of `model_validate`, so values are not
+    type-checked or coerced; nested variants, transcripts and population
+    frequencies are constructed the same way so they keep their model types.
+    Unlike validation, `model_construct` also fills an aliased field from its
+    attribute name, so those names must not match a Nirvana key (see
+    `Variant.clinvar_preview`).
+
+    Args:
+        position: Position dictionary as streamed by `open_positions`
+    Returns:
+        Position object
+    """
+    variants = []
+    for variant in position.get("variants") or ():
+        fields = dict(variant)
+        for key in ("gnomad", "gnomad-exome", "topmed"):
+            if variant.get(key):
+                fields[key] = PopulationFrequencies.model_construct(**variant[key])
+        if variant.get("transcripts"):
+            fields["transcripts"] = [
+                Transcript.model_construct(**t) for t in variant["transcripts"]
+            ]
+        variants.append(Variant.model_construct(**fields))
+
+    return Position.model_construct(**dict(position, variants=variants or None))
 
 
 class Parser:
@@ -479,14 +776,14 @@ class Parser:
         Returns:
             Generator: Filtered variants.
         """
-        positions = (
-            Position.model_validate(position)
-            for position in self.annotated_data.positions
-            for variant in position.get("variants", {})
-            if (freq := variant.get("gnomad", {}).get(frequency_key, None))
-            and frequency_threshold_low < freq < frequency_threshold_high
-        )
-        return positions
+        # Filter on the raw dicts and only validate positions that pass
+        with self.annotated_data.open_positions() as positions:
+            for position in positions:
+                for variant in position.get("variants") or ():
+                    freq = (variant.get("gnomad") or {}).get(frequency_key)
+                    if freq and frequency_threshold_low < freq < frequency_threshold_high:
+                        yield construct_position(position)
+                        break
 
     def get_positions_with_cannonical_transcripts(self) -> Generator[Any, Any, None]:
         """
@@ -495,15 +792,15 @@ class Parser:
         Returns:
             Generator: Positions with canonical transcripts.
         """
-        positions = (
-            Position.model_validate(position)
-            for position in self.annotated_data.positions
-            for variant in position.get("variants", {})
-            for transcript in variant.get("transcripts", [])
-            if transcript.get("isCanonical")
-        )
-
-        return positions
+        with self.annotated_data.open_positions() as positions:
+            for position in positions:
+                for variant in position.get("variants") or ():
+                    if any(
+                        transcript.get("isCanonical")
+                        for transcript in variant.get("transcripts") or ()
+                    ):
+                        yield construct_position(position)
+                        break
 
     # def filter_transcripts_by_consequence(
     #     self, include: Optional[List[str]] = None, exclude: Optional[List[str]] = None
@@ -524,152 +821,142 @@ class Parser:
     #     if not include:
     #         include = []
 
-    #     positions = (
-    #         Position.model_validate(position)
-    #         for position in self.annotated_data.positions
-    #         for variant in position.get("variants", {})
-    #         for transcript in variant.get("transcripts", [])
-    #         for consequence in transcript.get("consequence", [])
-    #         if (not bool(include) or consequence in include)
-    #         and consequence not in exclude
-    #     )
-    #     return positions
+    #     with self.annotated_data.open_positions() as positions:
+    #         for position in positions:
+    #             if any(
+    #                 (not bool(include) or consequence in include)
+    #                 and consequence not in exclude
+    #                 for variant in position.get("variants") or ()
+    #                 for transcript in variant.get("transcripts") or ()
+    #                 for consequence in transcript.get("consequence") or ()
+    #             ):
+    #                 yield construct_position(position)
 
 
-def variant_to_dict(
-    position: Position, variant: Variant, include_transcripts: bool = True
-) -> Dict[str, Any]:
+def transcript_fields(transcript: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Convert a Pydantic Variant object to a dictionary for Hail.
-    Ensures ALL schema fields are present with None as default.
+    Map a raw Nirvana transcript onto TRANSCRIPT_FIELDS.
 
     Args:
-        position: Position object
-        variant: Variant object
-        include_transcripts: Whether to include transcript annotations
+        transcript: Transcript dictionary of a variant
     Returns:
-        Dictionary with all fields for Hail Table
+        Dictionary with the TRANSCRIPT_FIELDS keys
     """
-    variant_dict = variant.model_dump()
-
-    # Initialize with ALL fields from schema set to None
-    record = {
-        "chromosome": position.chromosome,
-        "position": position.position,
-        "ref": position.refAllele,
-        "alt": variant.altAllele,
-        "vid": variant.vid,
-        "hgvsg": variant.hgvsg,
-        "variant_type": variant.variantType,
-        "begin": variant.begin,
-        "end": variant.end,
-        "filters": ",".join(position.filters) if position.filters else None,
-        "mapping_quality": position.mappingQuality,
-        "fisher_strand_bias": variant_dict.get("fisherStrandBias"),
-        "quality": variant_dict.get("quality"),
-        "cytogenetic_band": position.cytogeneticBand,
-        "phylop_score": variant.phylopScore,
-        "phylop_primate_score": variant.phyloPPrimateScore,
-        "gerp_score": variant_dict.get("gerpScore"),
-        "dann_score": variant_dict.get("dannScore"),
-        "rsid": None,
-        # Initialize all gnomAD genome fields
-        "gnomad_af": None,
-        "gnomad_ac": None,
-        "gnomad_an": None,
-        "gnomad_hc": None,
-        "gnomad_afr_af": None,
-        "gnomad_amr_af": None,
-        "gnomad_eas_af": None,
-        "gnomad_fin_af": None,
-        "gnomad_nfe_af": None,
-        "gnomad_asj_af": None,
-        "gnomad_sas_af": None,
-        "gnomad_oth_af": None,
-        "gnomad_failed_filter": None,
-        # Initialize all gnomAD exome fields
-        "gnomad_exome_af": None,
-        "gnomad_exome_ac": None,
-        "gnomad_exome_an": None,
-        "gnomad_exome_hc": None,
-        "gnomad_exome_failed_filter": None,
-        # Initialize TOPMed fields
-        "topmed_af": None,
-        "topmed_ac": None,
-        "topmed_an": None,
-        "topmed_hc": None,
-        "topmed_failed_filter": None,
-        # Initialize ClinVar fields
-        "clinvar_variant_type": None,
-        "clinvar_significance": None,
-        "clinvar_id": None,
-        # Initialize transcript fields
-        "n_transcripts": 0,
-        "transcripts": [],
-        "samples": None,
+    return {
+        "transcript_id": transcript.get("transcript"),
+        "source": transcript.get("source"),
+        "bio_type": transcript.get("bioType"),
+        "gene_id": transcript.get("geneId"),
+        "hgnc": transcript.get("hgnc"),
+        "consequences": transcript.get("consequence") or [],
+        "impact": transcript.get("impact"),
+        "is_canonical": transcript.get("isCanonical") or False,
     }
 
+
+def append_variant(
+    variant_cols: Dict[str, List[Any]],
+    variant_index: int,
+    position: Dict[str, Any],
+    variant: Dict[str, Any],
+) -> None:
+    """
+    Append a raw Nirvana variant to the variant column store.
+    Fields not present in the annotation are appended as missing.
+
+    The dictionaries are read as decoded by the JSON reader, without building
+    the Pydantic models.
+
+    Transcripts and samples are not part of the variant columns; they are
+    appended separately by `append_transcripts` and `append_samples`.
+
+    Args:
+        variant_cols: Column store following HAIL_SCHEMA
+        variant_index: Row identifier of the variant record
+        position: Position dictionary
+        variant: Variant dictionary of the position
+    """
+    cols = variant_cols
+    cols["chromosome"].append(position.get("chromosome"))
+    cols["position"].append(position.get("position"))
+    cols["ref"].append(position.get("refAllele"))
+    cols["alt"].append(variant.get("altAllele"))
+    cols["vid"].append(variant.get("vid"))
+    cols["hgvsg"].append(variant.get("hgvsg"))
+    cols["variant_type"].append(variant.get("variantType"))
+    cols["begin"].append(variant.get("begin"))
+    cols["end"].append(variant.get("end"))
+    cols["filters"].append(position.get("filters") or [])
+    cols["mapping_quality"].append(position.get("mappingQuality"))
+    cols["fisher_strand_bias"].append(variant.get("fisherStrandBias"))
+    cols["quality"].append(variant.get("quality"))
+    cols["cytogenetic_band"].append(position.get("cytogeneticBand"))
+    cols["phylop_score"].append(variant.get("phylopScore"))
+    cols["phylop_primate_score"].append(variant.get("phyloPPrimateScore"))
+    cols["gerp_score"].append(variant.get("gerpScore"))
+    cols["dann_score"].append(variant.get("dannScore"))
+
     # Extract dbSNP
-    dbsnp = variant_dict.get("dbsnp", {})
+    dbsnp = variant.get("dbsnp")
     rsids = []
     if dbsnp and isinstance(dbsnp, dict):
         rsids = dbsnp.get("ids", [])
     elif dbsnp and isinstance(dbsnp, list):
         rsids.extend(dbsnp)
-    record["rsid"] = ','.join(rsids) if rsids else None
+    cols["rsid"].append(','.join(rsids) if rsids else None)
 
     # Extract gnomAD genome
-    gnomad = variant_dict.get("gnomad", {})
-    if gnomad:
-        record["gnomad_af"] = gnomad.get("allAf")
-        record["gnomad_ac"] = gnomad.get("allAc")
-        record["gnomad_an"] = gnomad.get("allAn")
-        record["gnomad_hc"] = gnomad.get("allHc")
-        record["gnomad_afr_af"] = gnomad.get("afrAf")
-        record["gnomad_amr_af"] = gnomad.get("amrAf")
-        record["gnomad_eas_af"] = gnomad.get("easAf")
-        record["gnomad_fin_af"] = gnomad.get("finAf")
-        record["gnomad_nfe_af"] = gnomad.get("nfeAf")
-        record["gnomad_asj_af"] = gnomad.get("asjAf")
-        record["gnomad_sas_af"] = gnomad.get("sasAf")
-        record["gnomad_oth_af"] = gnomad.get("othAf")
-        record["gnomad_failed_filter"] = gnomad.get("failedFilter")
+    gnomad = variant.get("gnomad") or {}
+    cols["gnomad_af"].append(gnomad.get("allAf"))
+    cols["gnomad_ac"].append(gnomad.get("allAc"))
+    cols["gnomad_an"].append(gnomad.get("allAn"))
+    cols["gnomad_hc"].append(gnomad.get("allHc"))
+    cols["gnomad_afr_af"].append(gnomad.get("afrAf"))
+    cols["gnomad_amr_af"].append(gnomad.get("amrAf"))
+    cols["gnomad_eas_af"].append(gnomad.get("easAf"))
+    cols["gnomad_fin_af"].append(gnomad.get("finAf"))
+    cols["gnomad_nfe_af"].append(gnomad.get("nfeAf"))
+    cols["gnomad_asj_af"].append(gnomad.get("asjAf"))
+    cols["gnomad_sas_af"].append(gnomad.get("sasAf"))
+    cols["gnomad_oth_af"].append(gnomad.get("othAf"))
+    cols["gnomad_failed_filter"].append(gnomad.get("failedFilter"))
 
     # Extract gnomAD exome
-    gnomad_exome = variant_dict.get("gnomad-exome", {})
-    if gnomad_exome:
-        record["gnomad_exome_af"] = gnomad_exome.get("allAf")
-        record["gnomad_exome_ac"] = gnomad_exome.get("allAc")
-        record["gnomad_exome_an"] = gnomad_exome.get("allAn")
-        record["gnomad_exome_hc"] = gnomad_exome.get("allHc")
-        record["gnomad_exome_failed_filter"] = gnomad_exome.get("failedFilter")
+    gnomad_exome = variant.get("gnomad-exome") or {}
+    cols["gnomad_exome_af"].append(gnomad_exome.get("allAf"))
+    cols["gnomad_exome_ac"].append(gnomad_exome.get("allAc"))
+    cols["gnomad_exome_an"].append(gnomad_exome.get("allAn"))
+    cols["gnomad_exome_hc"].append(gnomad_exome.get("allHc"))
+    cols["gnomad_exome_failed_filter"].append(gnomad_exome.get("failedFilter"))
 
     # Extract TOPMed
-    topmed = variant_dict.get("topmed", {})
-    if topmed:
-        record["topmed_af"] = topmed.get("allAf")
-        record["topmed_ac"] = topmed.get("allAc")
-        record["topmed_an"] = topmed.get("allAn")
-        record["topmed_hc"] = topmed.get("allHc")
-        record["topmed_failed_filter"] = topmed.get("failedFilter")
+    topmed = variant.get("topmed") or {}
+    cols["topmed_af"].append(topmed.get("allAf"))
+    cols["topmed_ac"].append(topmed.get("allAc"))
+    cols["topmed_an"].append(topmed.get("allAn"))
+    cols["topmed_hc"].append(topmed.get("allHc"))
+    cols["topmed_failed_filter"].append(topmed.get("failedFilter"))
 
     # Extract ClinVar
-    clinvar = variant_dict.get("clinvar-preview", {})
+    clinvar_variant_type = None
+    clinvar_significance = None
+    clinvar_id = None
+    clinvar = variant.get("clinvar-preview")
     if clinvar:
         if isinstance(clinvar, dict):
             # Check for isAlleleSpecific
             if clinvar.get("isAlleleSpecific") is True:
                 # Extract variantType
-                record["clinvar_variant_type"] = clinvar.get("variantType")
+                clinvar_variant_type = clinvar.get("variantType")
                 
                 # Extract classification from germlineClassification
                 classifications = clinvar.get("classifications", {}).get("germlineClassification", {})
-                record["clinvar_significance"] = classifications.get("classification")
+                clinvar_significance = classifications.get("classification")
                 
                 # Extract accession and version
                 accession = clinvar.get("accession")
                 version = clinvar.get("version")
-                record["clinvar_id"] = f"{accession}.{version}" if accession and version else accession
+                clinvar_id = f"{accession}.{version}" if accession and version else accession
             
         elif isinstance(clinvar, list):
             # Filter for isAlleleSpecific == True
@@ -683,7 +970,7 @@ def variant_to_dict(
                 str(vt) for c in filtered_clinvar 
                 if (vt := c.get("variantType")) is not None
             ]
-            record["clinvar_variant_type"] = ";".join(variant_types) if variant_types else None
+            clinvar_variant_type = ";".join(variant_types) if variant_types else None
             
             # Collect classifications
             classifications = []
@@ -692,7 +979,7 @@ def variant_to_dict(
                 classification = germline_class.get("classification")
                 if classification:
                     classifications.append(classification)
-            record["clinvar_significance"] = ";".join(classifications) if classifications else None
+            clinvar_significance = ";".join(classifications) if classifications else None
             
             # Collect accessions
             accessions = []
@@ -703,38 +990,150 @@ def variant_to_dict(
                     accessions.append(f"{accession}.{version}")
                 elif accession:
                     accessions.append(accession)
-            record["clinvar_id"] = ";".join(accessions) if accessions else None
-    # Include transcripts
-    if include_transcripts and variant.transcripts:
-        record["transcripts"] = [
-            {
-                "transcript_id": t.transcript,
-                "source": t.source,
-                "bio_type": t.bioType,
-                "gene_id": t.geneId,
-                "hgnc": t.hgnc,
-                "consequences": t.consequence if t.consequence else [],
-                "impact": t.impact,
-                "is_canonical": t.isCanonical if t.isCanonical else False,
-            }
-            for t in variant.transcripts
-        ]
-        record["n_transcripts"] = len(variant.transcripts)
-
-    # Include samples
-    if position.samples:
-        record["samples"] = [
-            {
-                "genotype": s.get("genotype"),
-                "variant_frequencies": s.get("variantFrequencies", []),
-                "total_depth": s.get("totalDepth"),
-                "genotype_quality": s.get("genotypeQuality"),
-                "allele_depths": s.get("alleleDepths", []),
-            }
-            for s in position.samples
-        ]
+            clinvar_id = ";".join(accessions) if accessions else None
+    # clinvar_significance = clinvar_transform(clinvar_significance)
+    cols["clinvar_variant_type"].append(clinvar_variant_type)
+    cols["clinvar_significance"].append(clinvar_significance)
+    cols["clinvar_id"].append(clinvar_id)
+
+    # Count and summarise transcripts: first canonical transcript, consequences, genes
+    transcripts = variant.get("transcripts") or ()
+    canonical_transcript = None
+    consequences = set()
+    genes = set()
+    for t in transcripts:
+        if canonical_transcript is None and t.get("isCanonical"):
+            canonical_transcript = transcript_fields(t)
+        consequences.update(t.get("consequence") or ())
+        hgnc = t.get("hgnc")
+        if hgnc is not None:
+            genes.add(hgnc)
+    cols["n_transcripts"].append(len(transcripts))
+    cols["canonical_transcript"].append(canonical_transcript)
+    # Order does not matter: Hail turns both into sets
+    cols["all_consequences"].append(list(consequences))
+    cols["genes"].append(list(genes))
+    cols["variant_index"].append(variant_index)
+
+
+def new_columns(schema: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """
+    Create an empty column store with one list per schema field.
+
+    Args:
+        schema: Hail schema the columns follow
+    Returns:
+        Dictionary mapping field names to empty lists
+    """
+    return {name: [] for name in schema}
+
+
+def append_transcripts(
+    transcript_cols: Dict[str, List[Any]],
+    variant_index: int,
+    variant: Dict[str, Any],
+) -> None:
+    """
+    Append the transcripts of a variant to the transcript column store.
 
-    return record
+    Args:
+        transcript_cols: Column store following TRANSCRIPT_SCHEMA
+        variant_index: Row identifier of the variant record
+        variant: Variant dictionary
+    """
+    transcripts = variant.get("transcripts")
+    if not transcripts:
+        return
+
+    for index, t in enumerate(transcripts):
+        transcript_cols["variant_index"].append(variant_index)
+        transcript_cols["transcript_index"].append(index)
+        for name, value in transcript_fields(t).items():
+            transcript_cols[name].append(value)
+
+
+def append_samples(
+    sample_cols: Dict[str, List[Any]],
+    variant_index: int,
+    position: Dict[str, Any],
+) -> None:
+    """
+    Append the samples of a position to the sample column store, keyed by variant.
+
+    Args:
+        sample_cols: Column store following SAMPLE_SCHEMA
+        variant_index: Row identifier of the variant record
+        position: Position dictionary
+    """
+    samples = position.get("samples")
+    if not samples:
+        return
+
+    for index, s in enumerate(samples):
+        sample_cols["variant_index"].append(variant_index)
+        sample_cols["sample_index"].append(index)
+        sample_cols["genotype"].append(s.get("genotype"))
+        sample_cols["variant_frequencies"].append(s.get("variantFrequencies", []))
+        sample_cols["total_depth"].append(s.get("totalDepth"))
+        sample_cols["genotype_quality"].append(s.get("genotypeQuality"))
+        sample_cols["allele_depths"].append(s.get("alleleDepths", []))
+
+
+def convert_positions(
+    first_index: int,
+    positions: List[Dict[str, Any]],
+    keep_all_transcripts: bool = True,
+) -> Tuple[pa.Table, pa.Table, pa.Table]:
+    """
+    Convert a chunk of position dictionaries into variant, transcript and
+    sample batches.
+
+    Runs in the worker processes of `convert_to_hail`, so it only takes and
+    returns picklable values. Positions may arrive as undecoded JSON bytes,
+    which are decoded here rather than in the reading process.
+
+    Args:
+        first_index: Row identifier of the first variant in the chunk
+        positions: Position dictionaries or JSON bytes as streamed by
+            `open_positions`
+        keep_all_transcripts: Whether to emit one row per transcript; when
+            False the transcript table is left empty
+    Returns:
+        Arrow tables following VARIANT_ARROW_SCHEMA, TRANSCRIPT_ARROW_SCHEMA
+        and SAMPLE_ARROW_SCHEMA
+    """
+    variant_cols = new_columns(HAIL_SCHEMA)
+    transcript_cols = new_columns(TRANSCRIPT_SCHEMA)
+    sample_cols = new_columns(SAMPLE_SCHEMA)
+    variant_index = first_index
+
+    for position in positions:
+        if isinstance(position, bytes):
+            position = orjson.loads(position)
+        for variant in position.get("variants") or ():
+            append_variant(variant_cols, variant_index, position, variant)
+            if keep_all_transcripts:
+                append_transcripts(transcript_cols, variant_index, variant)
+            append_samples(sample_cols, variant_index, position)
+            variant_index += 1
+
+    return (
+        pa.Table.from_pydict(variant_cols, schema=VARIANT_ARROW_SCHEMA),
+        pa.Table.from_pydict(transcript_cols, schema=TRANSCRIPT_ARROW_SCHEMA),
+        pa.Table.from_pydict(sample_cols, schema=SAMPLE_ARROW_SCHEMA),
+    )
+
+
+def _read_parquet_table(path: str) -> hl.Table:
+    """
+    Read a Parquet file written by `convert_to_hail` as an unkeyed Hail Table.
+
+    Args:
+        path: Path of the Parquet file
+    Returns:
+        Hail Table with the Parquet columns as row fields
+    """
+    return hl.Table.from_spark(Env.spark_session().read.parquet(path))
 
 
 def convert_to_hail(
@@ -743,9 +1142,12 @@ def convert_to_hail(
     max_positions: Optional[int] = None,
     batch_size: int = 2500,
     temp_dir: Optional[str] = None,
+    workers: Optional[int] = None,
+    keep_all_transcripts: bool = False,
+    verbose: bool = False,
 ) -> hl.Table:
     """
-    Convert JSON to Hail Table using batched approach with disk-based intermediate tables
+    Convert JSON to Hail Table using batches appended to intermediate Parquet files
 
     Args:
         json_file: Path to input JSON file
@@ -753,6 +1155,10 @@ def convert_to_hail(
         max_positions: Maximum number of positions to process (None for all)
         batch_size: Number of variants per batch
         temp_dir: Temporary directory for intermediate files (None for auto-generated)
+        workers: Number of processes converting positions (None for one per CPU)
+        keep_all_transcripts: Whether to keep the full `transcripts` array; the
+            canonical transcript, consequences and genes are always kept
+        verbose: Whether to print the schema of the written table
     Returns:
         Hail Table with variant-level annotations
     """
@@ -769,137 +1175,197 @@ def convert_to_hail(
     os.makedirs(temp_dir, exist_ok=True)
     print(f"\nUsing temp directory: {temp_dir}")
 
-    print("\nProcessing positions...")
-    batch_records = []
+    workers = workers or os.cpu_count() or 1
+    print(f"\nProcessing positions with {workers} workers...")
     position_count = 0
     variant_count = 0
     batch_num = 0
-    batch_paths = []
-
-    for position_dict in annotated_data.positions:
-        if position_count % 1000 == 0 and position_count > 0:
-            print(
-                f"  Processed {position_count} positions, {variant_count} variants..."
+    # Each batch is appended as a row group to one Parquet file per table
+    variant_path = os.path.join(temp_dir, "variants.parquet")
+    transcript_path = os.path.join(temp_dir, "transcripts.parquet")
+    sample_path = os.path.join(temp_dir, "samples.parquet")
+
+    with ExitStack() as stack:
+        variant_writer = stack.enter_context(
+            pq.ParquetWriter(variant_path, VARIANT_ARROW_SCHEMA)
+        )
+        transcript_writer = (
+            stack.enter_context(
+                pq.ParquetWriter(transcript_path, TRANSCRIPT_ARROW_SCHEMA)
             )
+            if keep_all_transcripts
+            else None
+        )
+        sample_writer = stack.enter_context(
+            pq.ParquetWriter(sample_path, SAMPLE_ARROW_SCHEMA)
+        )
+        # Lines are decoded in the workers, which also saves pickling dictionaries
+        positions = stack.enter_context(annotated_data.open_positions(raw=True))
+        # Spawned workers do not inherit the JVM gateway threads of the driver
+        pool = stack.enter_context(
+            multiprocessing.get_context("spawn").Pool(processes=workers)
+        )
+        # Parquet writes release the GIL, so they overlap with reading positions
+        writer = stack.enter_context(ThreadPoolExecutor(max_workers=1))
+        # Chunks in flight; bounded so the stream is not read ahead into memory
+        pending = deque()
+        writing = None
+        # Tables waiting to fill a row group, per writer
+        buffers = [
+            (parquet_writer, [])
+            for parquet_writer in (variant_writer, transcript_writer, sample_writer)
+        ]
 
-        position = Position.model_validate(position_dict)
-
-        if position.variants:
-            for variant in position.variants:
-                record = variant_to_dict(position, variant, include_transcripts=True)
-                # clinvar_consensus = clinvar_transform(record["clinvar_significance"])
-                # record["clinvar_significance"] = clinvar_consensus
-                batch_records.append(record)
-                variant_count += 1
-
-                # Write batch to disk when full
-                if len(batch_records) >= batch_size:
-                    batch_path = os.path.join(temp_dir, f"batch_{batch_num}.ht")
-                    print(
-                        f"  Writing batch {batch_num} with {len(batch_records)} variants to {batch_path}"
-                    )
-
-                    # Convert and create table with schema
-                    clean_records = [_convert_for_hail(r) for r in batch_records]
-                    batch_ht = hl.Table.parallelize(
-                        clean_records, schema=hl.tstruct(**HAIL_SCHEMA)
-                    )
-
-                    # Add locus and alleles
-                    batch_ht = batch_ht.annotate(
-                        locus=hl.locus(
-                            batch_ht.chromosome,
-                            batch_ht.position,
-                            reference_genome="GRCh38",
+        def flush(parquet_writer: pq.ParquetWriter, tables: List[pa.Table]) -> None:
+            if tables:
+                parquet_writer.write_table(pa.concat_tables(tables))
+                tables.clear()
+
+        def write_tables(number: int, *batch: pa.Table) -> None:
+            print(f"  Writing batch {number} with {batch[0].num_rows} variants")
+            for (parquet_writer, tables), table in zip(buffers, batch):
+                if parquet_writer is None:
+                    continue
+                tables.append(table)
+                if sum(t.num_rows for t in tables) >= ROW_GROUP_ROWS:
+                    flush(parquet_writer, tables)
+
+        def write_batch() -> None:
+            nonlocal batch_num, variant_count, writing
+            tables = pending.popleft().get()
+            variant_count += tables[0].num_rows
+            # Keep a single batch queued behind the writer thread
+            if writing is not None:
+                writing.result()
+            writing = writer.submit(write_tables, batch_num, *tables)
+            batch_num += 1
+
+        chunk = []
+        chunk_variants = 0
+        chunk_num = 0
+        for position in positions:
+            if position_count % 1000 == 0 and position_count > 0:
+                print(
+                    f"  Processed {position_count} positions, {variant_count} variants written..."
+                )
+
+            chunk.append(position)
+            chunk_variants += (
+                position.count(VARIANT_KEY)
+                if isinstance(position, bytes)
+                else len(position.get("variants") or ())
+            )
+            position_count += 1
+
+            # Hand the chunk to a worker once it holds a full batch of variants
+            if chunk_variants >= batch_size:
+                pending.append(
+                    pool.apply_async(
+                        convert_positions,
+                        (
+                            chunk_num * CHUNK_INDEX_STRIDE,
+                            chunk,
+                            keep_all_transcripts,
                         ),
-                        alleles=hl.array([batch_ht.ref, batch_ht.alt]),
                     )
-
-                    # Write to disk
-                    batch_ht.write(batch_path, overwrite=True)
-                    batch_paths.append(batch_path)
-
-                    # Clear memory
-                    batch_records = []
-                    batch_num += 1
-
-        position_count += 1
-
-        if max_positions and position_count >= max_positions:
-            print(f"Reached max_positions limit of {max_positions}")
-            break
-
-    # Handle remaining records
-    if batch_records:
-        batch_path = os.path.join(temp_dir, f"batch_{batch_num}.ht")
-        print(
-            f"  Writing final batch {batch_num} with {len(batch_records)} variants to {batch_path}"
-        )
-
-        clean_records = [_convert_for_hail(r) for r in batch_records]
-        batch_ht = hl.Table.parallelize(clean_records, schema=hl.tstruct(**HAIL_SCHEMA))
-        batch_ht = batch_ht.annotate(
-            locus=hl.locus(
-                batch_ht.chromosome, batch_ht.position, reference_genome="GRCh38"
-            ),
-            alleles=hl.array([batch_ht.ref, batch_ht.alt]),
-        )
-        batch_ht.write(batch_path, overwrite=True)
-        batch_paths.append(batch_path)
+                )
+                chunk_num += 1
+                chunk = []
+                chunk_variants = 0
+                if len(pending) >= 2 * workers:
+                    write_batch()
+
+            if max_positions and position_count >= max_positions:
+                print(f"Reached max_positions limit of {max_positions}")
+                break
+
+        # Handle remaining positions
+        if chunk:
+            pending.append(
+                pool.apply_async(
+                    convert_positions,
+                    (chunk_num * CHUNK_INDEX_STRIDE, chunk, keep_all_transcripts),
+                )
+            )
+        while pending:
+            write_batch()
+        if writing is not None:
+            writing.result()
+        for parquet_writer, tables in buffers:
+            if parquet_writer is not None:
+                flush(parquet_writer, tables)
 
     print(f"\nTotal: {position_count} positions, {variant_count} variants")
-    print(f"Created {len(batch_paths)} batch tables")
+    print(f"Wrote {batch_num} batches")
 
-    # Union all batches
-    print("\nCombining batches...")
-    if len(batch_paths) == 1:
-        ht = hl.read_table(batch_paths[0])
-    else:
-        tables = [hl.read_table(path) for path in batch_paths]
-        ht = tables[0].union(*tables[1:])
+    # Read each Parquet file back as a single table
+    print("\nReading batches...")
+    ht = _read_parquet_table(variant_path)
+    sample_ht = _read_parquet_table(sample_path)
 
     # Key by locus and alleles
     print("Setting key (locus, alleles)...")
+    ht = ht.annotate(
+        locus=hl.locus(ht.chromosome, ht.position, reference_genome="GRCh38"),
+        alleles=hl.array([ht.ref, ht.alt]),
+    )
     ht = ht.key_by(ht.locus, ht.alleles)
 
+    # Collect samples (and transcripts if requested) per variant, preserving their
+    # original order
+    print("Joining samples...")
+    sample_ht = sample_ht.group_by(sample_ht.variant_index).aggregate(
+        samples=hl.sorted(
+            hl.agg.collect(sample_ht.row.drop("variant_index")),
+            key=lambda s: s.sample_index,
+        ).map(lambda s: s.drop("sample_index"))
+    )
+    ht = ht.annotate(samples=sample_ht[ht.variant_index].samples)
+    if keep_all_transcripts:
+        print("Joining transcripts...")
+        transcript_ht = _read_parquet_table(transcript_path)
+        transcript_ht = transcript_ht.group_by(transcript_ht.variant_index).aggregate(
+            transcripts=hl.sorted(
+                hl.agg.collect(transcript_ht.row.drop("variant_index")),
+                key=lambda t: t.transcript_index,
+            ).map(lambda t: t.drop("transcript_index"))
+        )
+        ht = ht.annotate(
+            transcripts=hl.coalesce(
+                transcript_ht[ht.variant_index].transcripts,
+                hl.empty_array(transcript_ht.transcripts.dtype.element_type),
+            )
+        )
+    ht = ht.drop("variant_index")
+
     # Add computed annotations
     print("Adding computed annotations...")
     ht = ht.annotate(
-        max_gnomad_af=hl.max(
-            hl.array([ht.gnomad_af, ht.gnomad_exome_af]).filter(hl.is_defined)
-        ),
+        # Fixed-arity maxes skip missing values without building an array
+        max_gnomad_af=hl.max(ht.gnomad_af, ht.gnomad_exome_af, filter_missing=True),
         max_pop_af=hl.max(
-            hl.array(
-                [
-                    ht.gnomad_afr_af,
-                    ht.gnomad_amr_af,
-                    ht.gnomad_eas_af,
-                    ht.gnomad_fin_af,
-                    ht.gnomad_nfe_af,
-                    ht.gnomad_asj_af,
-                    ht.gnomad_sas_af,
-                    ht.gnomad_oth_af,
-                ]
-            ).filter(hl.is_defined)
-        ),
-        # Get canonical transcript safely - check if any exist after filtering
-        canonical_transcript=hl.bind(
-            lambda canonical_transcripts: hl.if_else(
-                hl.len(canonical_transcripts) > 0,
-                canonical_transcripts[0],
-                hl.missing(ht.transcripts.dtype.element_type),
-            ),
-            ht.transcripts.filter(lambda t: t.is_canonical),
+            ht.gnomad_afr_af,
+            ht.gnomad_amr_af,
+            ht.gnomad_eas_af,
+            ht.gnomad_fin_af,
+            ht.gnomad_nfe_af,
+            ht.gnomad_asj_af,
+            ht.gnomad_sas_af,
+            ht.gnomad_oth_af,
+            filter_missing=True,
         ),
-        all_consequences=hl.set(
-            hl.flatten(ht.transcripts.map(lambda t: t.consequences))
-        ),
-        genes=hl.set(ht.transcripts.map(lambda t: t.hgnc).filter(hl.is_defined)),
+        # The canonical transcript, consequences and genes come from the workers
+        all_consequences=hl.set(ht.all_consequences),
+        genes=hl.set(ht.genes),
     )
 
     # Write final table
     print(f"\nWriting final Hail Table to {output_path}...")
-    ht = ht.checkpoint(output_path, overwrite=True)
+    # Partitions bound for object stores or HDFS are written to local disk first
+    # and copied once complete
+    ht = ht.checkpoint(
+        output_path, overwrite=True, stage_locally="://" in output_path
+    )
 
     # Cleanup temp files
     print(f"\nCleaning up temp directory: {temp_dir}")
@@ -912,13 +1378,75 @@ def convert_to_hail(
     print("CONVERSION COMPLETE")
     print("=" * 60)
     print(f"Output: {output_path}")
-    print(f"Total variants: {ht.count()}")
-    print("\nSchema:")
-    ht.describe()
+    # Every variant read becomes one row, so the table need not be counted again
+    print(f"Total variants: {variant_count}")
+    if verbose:
+        print("\nSchema:")
+        ht.describe()
 
     return ht
 
 
+def physical_memory() -> Optional[int]:
+    """
+    Read the size of the physical memory.
+
+    Returns:
+        Physical memory in bytes, None if it cannot be read
+    """
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def memory_fraction(fraction: float) -> str:
+    """
+    Size a Spark memory setting as a fraction of the physical memory.
+
+    Args:
+        fraction: Share of the physical memory to use
+    Returns:
+        Memory size in Spark's format (e.g. "24g"), "32g" if it cannot be read
+    """
+    total = physical_memory()
+    if total is None:
+        return "32g"
+    return f"{max(1, int(total * fraction) >> 30)}g"
+
+
+def memory_bytes(size: str) -> int:
+    """
+    Convert a Spark memory size (e.g. "24g", "512m") to bytes.
+
+    Args:
+        size: Memory size with an optional k, m, g or t suffix
+    Returns:
+        Memory size in bytes
+    """
+    size = size.strip().lower().rstrip("b")
+    shift = {"k": 10, "m": 20, "g": 30, "t": 40}.get(size[-1:], 0)
+    return int(size[:-1] if shift else size) << shift
+
+
+def default_workers(jvm_memory: List[str]) -> int:
+    """
+    Count the conversion workers that fit beside the JVM in physical memory.
+
+    Args:
+        jvm_memory: Spark memory sizes held by the JVM (heap and off-heap)
+    Returns:
+        One worker per CPU, lowered so that each gets WORKER_MEMORY of the
+        memory left after the JVM share (at least one)
+    """
+    cpus = os.cpu_count() or 1
+    total = physical_memory()
+    if total is None:
+        return cpus
+    left = total - sum(memory_bytes(size) for size in jvm_memory)
+    return max(1, min(cpus, left // WORKER_MEMORY))
+
+
 def get_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Convert Illumina Nirvana JSON to Hail Table"
@@ -947,6 +1475,56 @@ def get_parser() -> argparse.ArgumentParser:
         default=2500,
         help="Number of variants per batch (default: 10000)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes converting positions (default: CPU "
+        "count, bounded by the memory left after the Spark driver and off-heap)",
+    )
+    parser.add_argument(
+        "--keep_all_transcripts",
+        action="store_true",
+        help="Keep the full transcripts array of each variant (default: only the "
+        "canonical transcript, consequences and genes)",
+    )
+    # Heap and off-heap together default to three quarters of the physical memory;
+    # the default --workers fits in what is left
+    parser.add_argument(
+        "--driver_memory",
+        type=str,
+        default=memory_fraction(0.6),
+        help="Spark driver memory (default: 60%% of the physical memory)",
+    )
+    parser.add_argument(
+        "--executor_memory",
+        type=str,
+        default=memory_fraction(0.6),
+        help="Spark executor memory (default: 60%% of the physical memory)",
+    )
+    parser.add_argument(
+        "--off_heap_size",
+        type=str,
+        default=memory_fraction(0.15),
+        help="Spark off-heap memory size (default: 15%% of the physical memory)",
+    )
+    parser.add_argument(
+        "--kryo_buffer_max",
+        type=str,
+        default="512m",
+        help="Maximum Kryo serialization buffer, below 2048m (default: 512m)",
+    )
+    parser.add_argument(
+        "--shuffle_partitions",
+        type=int,
+        default=2 * (os.cpu_count() or 1),
+        help="Number of Spark SQL shuffle partitions (default: twice the CPU count)",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Print the schema of the written and of the exported table",
+    )
     parser.add_argument(
         "--max_positions",
         type=int,
@@ -980,6 +1558,10 @@ def get_parser() -> argparse.ArgumentParser:
 if __name__ == "__main__":
     parser = get_parser()
     args = parser.parse_args()
+    # Spark runs locally, so the driver heap and off-heap share the machine
+    # with the conversion workers
+    if args.workers is None:
+        args.workers = default_workers([args.driver_memory, args.off_heap_size])
 
     # check if log path is provided and exists, if not, create it
     if args.log_path:
@@ -1002,12 +1584,12 @@ if __name__ == "__main__":
         app_name="Parse Illumina JSON",
         log=str(log_dir),
         default_reference=args.genome_ref,
+        # hl.init already sets the Kryo serializer; shuffles are compressed by default
         spark_conf={
-        'spark.driver.memory': '320g',
-        'spark.executor.memory': '320g',
-        'spark.driver.maxResultSize': '100g',
-        'spark.kryoserializer.buffer.max': '2047G'
-    }
+            **build_spark_conf(args),
+            'spark.rdd.compress': 'true',
+            'spark.shuffle.file.buffer': '96k',
+        },
     )
 
     # print("Spark master:", hl.default_reference().name)
@@ -1024,11 +1606,15 @@ if __name__ == "__main__":
         output_path=output_dir_str,
         max_positions=args.max_positions,  # Use None for all data
         batch_size=args.batch_size,  # Adjust based on available memory
+        workers=args.workers,
+        keep_all_transcripts=args.keep_all_transcripts,
+        verbose=args.verbose,
     )
     
-    print("\nFinal Hail Table:")
-    ht = ht.flatten()
-    ht.describe()
+    ht = prepare_for_export(ht)
+    if args.verbose:
+        print("\nFinal Hail Table:")
+        ht.describe()
     
     print("\nExporting to Elasticsearch...")
 
@@ -1038,11 +1624,8 @@ if __name__ == "__main__":
         port=args.port,
         index=args.index,
         index_type='_doc',
-        block_size=10000,
-        config={
-            "es.nodes.wan.only": "true"   # necessário quando acessar container via IP
-        }
-
+        block_size=estimate_block_size(ht),
+        config=ES_CONFIG,
     )
 
     print(
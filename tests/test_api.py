@@ -15,3 +15,27 @@ def test_read_main():
 def test_variant_validation():
     response = client.get("/variant/invalid-id")
     assert response.status_code == 400
+
+def test_variant_filter_formats(monkeypatch):
+    # Older indexes store filters as a comma-joined string, newer ones as an array
+    from app.api.routes import variant as variant_route
+
+    def fake_client(filters):
+        class FakeES:
+            async def search(self, index, body):
+                source = {"vid": "1-100-A-G", "chromosome": "1", "position": 100,
+                          "ref": "A", "alt": "G", "filters": filters}
+                return {"hits": {"hits": [{"_source": source}]}}
+
+        async def get_es_client():
+            return FakeES()
+        return get_es_client
+
+    results = []
+    for filters in (["PASS", "LowQ"], "PASS,LowQ"):
+        monkeypatch.setattr(variant_route, "get_es_client", fake_client(filters))
+        response = client.get("/variant/1-100-A-G")
+        assert response.status_code == 200
+        results.append(response.json()["summary"]["filter"])
+
+    assert results[0] == results[1] == ["PASS", "LowQ"]
@@ -0,0 +1,76 @@
+"""
+Tests for the Nirvana JSON models in scripts/parse_nirvana.py.
+"""
+import itertools
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("hail")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from parse_nirvana import AnnotatedData, Position, Variant, construct_position
+
+EXAMPLE = Path(__file__).resolve().parents[1] / "data" / "example.json.gz"
+
+VARIANT = {
+    "vid": "1-25420739-G-C",
+    "chromosome": "chr1",
+    "begin": 25420739,
+    "end": 25420739,
+    "refAllele": "G",
+    "altAllele": "C",
+}
+LEGACY_CLINVAR = [{"id": "RCV000000001.1", "significance": ["benign"]}]
+
+
+def test_legacy_clinvar_stays_extra():
+    # Only "clinvar-preview" fills the typed field; the legacy "clinvar" key does not
+    position = {
+        "chromosome": "chr1",
+        "position": 25420739,
+        "refAllele": "G",
+        "altAlleles": ["C"],
+        "variants": [dict(VARIANT, clinvar=LEGACY_CLINVAR)],
+    }
+    validated = Variant.model_validate(dict(VARIANT, clinvar=LEGACY_CLINVAR))
+    constructed = construct_position(position).variants[0]
+
+    for variant in (validated, constructed):
+        assert variant.clinvar_preview is None
+        record = variant.to_records()[0]
+        assert record.get("clinvar-preview") is None
+        assert record["clinvar"] == LEGACY_CLINVAR
+
+
+def test_constructed_positions_match_validated():
+    # The sample covers a variant with only the legacy "clinvar" key
+    with AnnotatedData(str(EXAMPLE)).open_positions() as positions:
+        sample = list(itertools.islice(positions, 1000))
+
+    for position in sample:
+        constructed = construct_position(position)
+        validated = Position.model_validate(position)
+        assert constructed.model_dump(by_alias=True) == validated.model_dump(by_alias=True)
+        assert constructed.to_records("variants") == validated.to_records("variants")
+
+
+def test_to_df_columns():
+    # Declared fields come first, then extra fields in JSON key order
+    with AnnotatedData(str(EXAMPLE)).open_positions() as positions:
+        position = Position.model_validate(next(positions))
+
+    assert list(position.to_df().columns) == [
+        "chromosome", "position", "refAllele", "altAlleles", "filters",
+        "mappingQuality", "cytogeneticBand", "vcfInfo", "samples", "variants",
+        "quality", "fisherStrandBias",
+    ]
+    assert list(position.variants[0].to_df().columns[:27]) == [
+        "vid", "chromosome", "begin", "end", "refAllele", "altAllele",
+        "variantType", "hgvsg", "phylopScore", "phyloPPrimateScore", "gerpScore",
+        "dannScore", "dbsnp", "transcripts", "gnomad.allAf", "gnomad.allAc",
+        "gnomad.allAn", "gnomad.allHc", "gnomad.afrAf", "gnomad.amrAf",
+        "gnomad.easAf", "gnomad.finAf", "gnomad.nfeAf", "gnomad.asjAf",
+        "gnomad.sasAf", "gnomad.failedFilter", "gnomad.coverage",
+    ]